@@ -8,14 +8,18 @@ MYSQL_HOST = '127.0.0.1'
 MYSQL_USER = 'root'
 MYSQL_PASSWORD = 'root'  # Change this to your MySQL password
 MYSQL_DATABASE = 'smsd'
+MYSQL_POOL_SIZE = 2  # Connections kept open in the pool (the daemon borrows one per poll)
 
 # Serial Port Configuration
 SERIAL_PORT = 'COM6'  # Windows: COM1, COM2, etc. | Linux: /dev/ttyUSB0, /dev/ttyACM0, etc.
 SERIAL_BAUD = 9600  # Baud rate (common: 9600, 115200)
 
 # Daemon Settings
-POLL_INTERVAL = 20  # Time in seconds between database checks
+POLL_INTERVAL = 20  # Maximum time in seconds between database checks when idle
+POLL_MIN_INTERVAL = 0.2  # Time in seconds between database checks while messages are queued
 MODEM_RESPONSE_TIMEOUT = 30  # Maximum seconds to wait for modem response (increased for multipart SMS)
+STRICT_DURABILITY = False  # True = commit after every SMS, False = commit every few SMS (at most 8 or 10 seconds' worth)
+BATCH_SIZE = 32  # Maximum pending messages fetched and sent per database poll
 
 # Logging Settings
 LOG_LEVEL = 'INFO'  # Options: DEBUG, INFO, WARNING, ERROR, CRITICAL (Changed to DEBUG for troubleshooting)
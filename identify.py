@@ -8,6 +8,7 @@ Run this before starting the daemon to verify your setup is correct.
 Usage: python identify.py
 """
 
+import re
 import serial
 import time
 import sys
@@ -20,29 +21,50 @@ if sys.platform == 'win32':
     except:
         pass
 
+# Final result codes, which carry no information for the caller
+_AT_RESULT_RE = re.compile(r'OK|ERROR')
+
+# A complete final result line that ends the response to a command; error
+# lines only count once their CRLF has arrived, so a split "+CME ERROR: 10"
+# is never cut short
+_FINAL_RESULT_RE = re.compile(rb'\r\nOK\r\n|(?:^|\n)(?:\+CM[ES] )?ERROR(?::[^\r\n]*)?\r\n')
+
+def enable_low_latency(ser):
+    """Ask the serial driver to deliver bytes immediately (Linux only)."""
+    # USB-serial adapters batch incoming bytes for up to 16ms by default;
+    # low-latency mode drops that to ~1ms per AT round-trip
+    try:
+        ser.set_low_latency_mode(True)
+        return True
+    except (AttributeError, NotImplementedError, OSError, ValueError):
+        # Not supported on this platform/driver, or insufficient permissions
+        return False
+
 def send_at_command(ser, command, wait_time=1.0):
     """Send AT command and return response."""
     try:
-        # Clear any existing data
-        ser.flushInput()
-        ser.flushOutput()
+        # Drop anything left over from the previous command (e.g. a late URC);
+        # the buffers were flushed once when the port was opened
+        if ser.in_waiting:
+            ser.read(ser.in_waiting)
         
         # Send command
         ser.write((command + '\r').encode())
-        time.sleep(wait_time)
         
-        # Read response
-        response = b''
-        while ser.in_waiting > 0:
-            response += ser.read(ser.in_waiting)
-            time.sleep(0.1)
+        # Read until the modem sends a final result code, giving up after
+        # wait_time seconds (ser.timeout keeps each read short)
+        response = bytearray()
+        deadline = time.monotonic() + wait_time
+        while time.monotonic() < deadline:
+            response.extend(ser.read(ser.in_waiting or 1))
+            if _FINAL_RESULT_RE.search(response):
+                break
         
         # Decode and clean response
         response_str = response.decode('utf-8', errors='ignore')
-        # Remove echo of command and clean up
-        lines = [line.strip() for line in response_str.split('\n') if line.strip()]
-        # Remove the command echo and OK
-        lines = [line for line in lines if line != command and line != 'OK' and line != '']
+        # Keep non-empty lines, minus the command echo and result codes
+        lines = [line for line in (raw.strip() for raw in response_str.split('\n'))
+                 if line and line != command and not _AT_RESULT_RE.fullmatch(line)]
         
         return '\n'.join(lines) if lines else 'Unknown'
     
@@ -50,18 +72,27 @@ def send_at_command(ser, command, wait_time=1.0):
         return f'Error: {e}'
 
 def parse_response(response, prefix=''):
-    """Parse AT command response and extract value."""
+    """
+    Parse AT command response and extract value.
+    
+    prefix may be a single string or a tuple of alternatives, which are
+    all checked in one pass over the response lines.
+    """
     if 'Error' in response:
         return response
     
+    prefixes = (prefix,) if isinstance(prefix, str) else prefix
+    
     lines = response.split('\n')
     for line in lines:
-        if prefix and line.startswith(prefix):
-            # Extract value after prefix
-            value = line[len(prefix):].strip()
-            # Remove quotes if present
-            return value.strip('"').strip()
-        elif not prefix and line and line not in ['OK', 'ERROR']:
+        if prefix:
+            for p in prefixes:
+                if line.startswith(p):
+                    # Extract value after prefix
+                    value = line[len(p):].strip()
+                    # Remove quotes if present
+                    return value.strip('"').strip()
+        elif line and line not in ['OK', 'ERROR']:
             return line.strip('"').strip()
     
     return 'Unknown'
@@ -77,8 +108,12 @@ def identify_modem():
     print(f"Connecting to {SERIAL_PORT} at {SERIAL_BAUD} baud...")
     
     try:
-        ser = serial.Serial(SERIAL_PORT, SERIAL_BAUD, timeout=2)
+        # Short read timeout: send_at_command polls against its own deadline
+        ser = serial.Serial(SERIAL_PORT, SERIAL_BAUD, timeout=0.05)
+        enable_low_latency(ser)
         time.sleep(0.5)
+        ser.reset_input_buffer()
+        ser.reset_output_buffer()
         print("[OK] Connected successfully!")
         print()
     except serial.SerialException as e:
@@ -160,9 +195,7 @@ def identify_modem():
         response = send_at_command(ser, 'AT+CCID')
         if 'Unknown' in response or 'Error' in response:
             response = send_at_command(ser, 'AT+ICCID')
-        iccid = parse_response(response, '+CCID: ')
-        if iccid == 'Unknown':
-            iccid = parse_response(response, '+ICCID: ')
+        iccid = parse_response(response, ('+CCID: ', '+ICCID: '))
         print(f"SIM ICCID            : {iccid}")
         
         # Phone Number (if available)
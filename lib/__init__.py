@@ -3,17 +3,20 @@ SMS Sender Library
 Modular components for SMS sending functionality
 """
 
-from .encoding import is_gsm7_compatible, calculate_sms_parts, split_message
-from .pdu import encode_gsm7, encode_phone_number, create_pdu
-from .modem import send_sms_pdu, send_sms
+from .encoding import is_gsm7_compatible, calculate_sms_parts, split_message, analyze_and_split
+from .pdu import encode_gsm7, encode_phone_number, encode_address, create_pdu
+from .modem import ModemSession, send_sms_pdu, send_sms
 
 __all__ = [
     'is_gsm7_compatible',
     'calculate_sms_parts',
     'split_message',
+    'analyze_and_split',
     'encode_gsm7',
     'encode_phone_number',
+    'encode_address',
     'create_pdu',
+    'ModemSession',
     'send_sms_pdu',
     'send_sms',
 ]
@@ -5,314 +5,396 @@ Handles all database interactions for the SMS sender daemon.
 """
 
 import logging
-import mysql.connector
+import re
+from collections import Counter
+from mysql.connector import pooling
 import time
 
 # Get logger
 logger = logging.getLogger('SMSDaemon')
 
+# Pending messages stay locked until their results are committed so several
+# daemons can share one outbox without sending the same message twice. Only
+# ids above the last one tried are fetched, so a batch never locks a message
+# it has already attempted, and a failed message waits RETRY_DELAY seconds
+# before it is tried again
+PENDING_SMS_QUERY = (
+    "SELECT id, phone_number, recipient, message, attempts FROM outbox "
+    "WHERE status='pending' AND attempts > 0 AND id > %s "
+    "AND (error_message IS NULL OR updated_at < NOW() - INTERVAL %s SECOND) "
+    "ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED"
+)
 
-def process_pending_sms_v2(cursor, db, modem):
+# Default number of messages fetched and sent per batch
+DEFAULT_BATCH_SIZE = 32
+
+# Bounds on the results kept in one open transaction. A crash or failed
+# commit rolls those back and the messages are sent again, so a batch is
+# committed every few messages or seconds rather than once at the end
+MAX_UNCOMMITTED = 8
+MAX_UNCOMMITTED_SECONDS = 10
+
+# Minimum seconds between attempts at a failed message, so a short modem or
+# network outage does not use up all of its attempts at once
+RETRY_DELAY = 20
+
+# Result tokens in a raw modem response; OK/ERROR only match as whole words
+# so text such as "LOOK" is not counted
+_RESPONSE_TOKEN_RE = re.compile(rb'\+CMGS:|\+CMS ERROR:|\bERROR\b|\bOK\b', re.IGNORECASE)
+
+
+class _OutboxUpdates:
     """
-    Fetch and send pending SMS messages using python-gsmmodem library.
+    Collects send results and writes them to the outbox in batches.
     
-    Args:
-        cursor: MySQL cursor
-        db: MySQL database connection
-        modem: ModemSMS instance from lib.modem_gsmlib
+    The UPDATEs share the plain cursor used for the SELECT. A typical batch
+    has only a row or two, and prepared statements would add a prepare
+    round-trip (and in the pure-Python connector a reset before every
+    execute) that such a batch never earns back.
+    """
+    
+    def __init__(self, db, cursor):
+        """
+        Args:
+            db: MySQL database connection
+            cursor: MySQL cursor on db
+        """
+        self.db = db
+        self.cursor = cursor
+        self.sent_ids = []      # Message IDs sent successfully
+        self.failed_rows = []   # (status, attempts, error_message, id) tuples
+    
+    def flush(self):
+        """Write and commit collected results, then clear them."""
+        if not self.sent_ids and not self.failed_rows:
+            return
+        
+        if self.sent_ids:
+            self.cursor.executemany(
+                "UPDATE outbox SET status='sent', sent_at=NOW(), updated_at=NOW() WHERE id=%s",
+                [(msg_id,) for msg_id in self.sent_ids]
+            )
+        if self.failed_rows:
+            self.cursor.executemany(
+                "UPDATE outbox SET status=%s, attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
+                self.failed_rows
+            )
+        self.db.commit()
+        
+        self.sent_ids.clear()
+        self.failed_rows.clear()
+
+
+def _with_connection(pool, process, *args):
+    """
+    Run process(cursor, updates, *args) on a connection borrowed from the pool.
+    
+    The pool checks the connection is alive on checkout and reconnects it if
+    needed. Any transaction left open by an error is rolled back so its row
+    locks are not kept while the connection sits idle in the pool.
     
     Returns:
-        cursor: Updated cursor (may be new instance)
+        Result of process, or 0 if no connection was available
     """
-    # Ensure database connection is alive and refresh cursor
     try:
-        db.ping(reconnect=True)
-        db.rollback()  # Roll back any uncommitted transaction
-        try:
-            cursor.close()
-        except:
-            pass
-        cursor = db.cursor(dictionary=True)
+        db = pool.get_connection()
     except Exception as e:
-        logger.error(f"Database connection refresh failed: {e}")
-        try:
-            cursor = db.cursor(dictionary=True)
-        except:
-            return cursor
+        logger.error(f"Failed to get database connection: {e}")
+        return 0
     
-    # Get pending messages that still have attempts remaining
     try:
-        query = "SELECT * FROM outbox WHERE status='pending' AND attempts > 0 ORDER BY id LIMIT 5"
-        logger.debug(f"Executing query: {query}")
-        cursor.execute(query)
-        messages = cursor.fetchall()
-        logger.debug(f"Query returned {len(messages)} row(s)")
-    except Exception as e:
-        logger.error(f"Failed to fetch pending messages: {e}")
-        return cursor
-    
-    if messages:
-        logger.debug(f"Found {len(messages)} pending message(s)")
-        for msg in messages:
-            logger.debug(f"  - ID: {msg['id']}, Phone: {msg['phone_number']}, Status: {msg['status']}, Attempts: {msg['attempts']}")
-    else:
-        logger.debug("No pending messages found in this cycle")
-    
-    for msg in messages:
-        msg_id = msg['id']
-        phone = msg['phone_number']
-        recipient = msg['recipient']
-        text = msg['message']
-        attempts_left = msg['attempts']
-        
-        logger.info(f"Sending SMS {msg_id} -> {recipient} ({phone}) [Attempts left: {attempts_left}]")
-        
-        send_start = time.time()
+        cursor = db.cursor()
+        try:
+            return process(cursor, _OutboxUpdates(db, cursor), *args)
+        finally:
+            cursor.close()
+    except Exception:
         try:
-            # Use the new modem library - it handles multipart automatically
-            success, result_msg = modem.send_sms(phone, text)
-            send_duration = time.time() - send_start
-            
-            if success:
-                cursor.execute(
-                    "UPDATE outbox SET status='sent', sent_at=NOW(), updated_at=NOW() WHERE id=%s",
-                    (msg_id,)
-                )
-                logger.info(f"[OK] SMS {msg_id} sent successfully to {phone} (took {send_duration:.1f}s)")
-            else:
-                # SMS failed, decrement attempts
-                new_attempts = attempts_left - 1
-                
-                if new_attempts <= 0:
-                    # No more attempts, mark as failed
-                    cursor.execute(
-                        "UPDATE outbox SET status='failed', attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
-                        (new_attempts, result_msg[:255], msg_id)
-                    )
-                    logger.error(f"[FAIL] SMS {msg_id} FAILED - No attempts remaining. Error: {result_msg}")
-                else:
-                    # Still have attempts, keep as pending
-                    cursor.execute(
-                        "UPDATE outbox SET attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
-                        (new_attempts, result_msg[:255], msg_id)
-                    )
-                    logger.warning(f"[RETRY] SMS {msg_id} failed - {new_attempts} attempts remaining. Error: {result_msg}")
-            
-            db.commit()
+            db.rollback()
+        except:
+            pass
+        raise
+    finally:
+        db.close()  # Returns the connection to the pool
 
-        except Exception as e:
-            # Exception occurred, decrement attempts
-            logger.exception(f"Exception sending SMS {msg_id}: {e}")
-            new_attempts = attempts_left - 1
-            
-            if new_attempts <= 0:
-                # No more attempts, mark as failed
-                cursor.execute(
-                    "UPDATE outbox SET status='failed', attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
-                    (new_attempts, str(e)[:255], msg_id)
-                )
-                logger.error(f"[FAIL] SMS {msg_id} FAILED - No attempts remaining (Exception)")
-            else:
-                # Still have attempts, keep as pending
-                cursor.execute(
-                    "UPDATE outbox SET attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
-                    (new_attempts, str(e)[:255], msg_id)
-                )
-                logger.warning(f"[RETRY] SMS {msg_id} error - {new_attempts} attempts remaining (Exception)")
-            
-            db.commit()
-    
-    # Return the cursor (might be a new one)
-    return cursor
 
+def process_pending_sms_v2(pool, modem, strict_durability=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Fetch and send pending SMS messages using python-gsmmodem library.
+    
+    Args:
+        pool: MySQL connection pool from connect_database
+        modem: ModemSMS instance from lib.modem_gsmlib
+        strict_durability: Lock, send and commit one message at a time instead
+            of up to MAX_UNCOMMITTED per transaction
+        batch_size: Maximum number of messages fetched and sent in one call
+    
+    Returns:
+        int: Number of messages sent successfully (0 if none)
+    """
+    # The modem library handles multipart automatically and already
+    # reports (success, message)
+    return _with_connection(pool, _process_batch, modem.send_sms, strict_durability, batch_size)
 
 
-def process_pending_sms(cursor, db, ser, send_sms_func, modem_timeout=3):
+def process_pending_sms(pool, ser, send_sms_func, modem_timeout=3, strict_durability=False,
+                        batch_size=DEFAULT_BATCH_SIZE):
     """
     Fetch and send pending SMS messages with retry logic.
     
     Args:
-        cursor: MySQL cursor
-        db: MySQL database connection
+        pool: MySQL connection pool from connect_database
         ser: Serial connection to modem
-        send_sms_func: Function to call for sending SMS
+        send_sms_func: Function to call for sending SMS; returns the raw
+            modem response as bytes
         modem_timeout: Modem response timeout
+        strict_durability: Lock, send and commit one message at a time instead
+            of up to MAX_UNCOMMITTED per transaction
+        batch_size: Maximum number of messages fetched and sent in one call
     
     Returns:
-        cursor: Updated cursor (may be new instance)
+        int: Number of messages sent successfully (0 if none)
     """
-    # Ensure database connection is alive and refresh cursor
-    try:
-        db.ping(reconnect=True)
-        # Start a fresh transaction to avoid stale reads
-        db.rollback()  # Roll back any uncommitted transaction
-        # Close old cursor and create fresh one to avoid caching
-        try:
-            cursor.close()
-        except:
-            pass
-        cursor = db.cursor(dictionary=True)
-    except Exception as e:
-        logger.error(f"Database connection refresh failed: {e}")
-        # Try to create new cursor anyway
-        try:
-            cursor = db.cursor(dictionary=True)
-        except:
-            return cursor
+    def send_fn(phone, text):
+        resp = send_sms_func(ser, phone, text, modem_timeout)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Modem full response for %s: %r", phone, resp.strip())
+        return _classify_modem_response(resp, modem_timeout)
+    
+    return _with_connection(pool, _process_batch, send_fn, strict_durability, batch_size)
+
+
+def _classify_modem_response(resp, modem_timeout):
+    """
+    Decide whether a raw modem response means the SMS was sent.
+    
+    For multipart SMS, all parts must have succeeded.
+    Success indicators: +CMGS: (with message ID) or just OK
+    Failure indicators: ERROR, +CMS ERROR, timeout with no response
+    
+    Args:
+        resp: Raw modem response (bytes)
+        modem_timeout: Modem response timeout, for the error message
+    
+    Returns:
+        tuple: (success: bool, error_message: str or None)
+    """
+    # Clean up the response for checking; it stays as raw bytes and is
+    # only decoded when an error message has to be stored
+    resp_clean = resp.strip()
     
-    # Get pending messages that still have attempts remaining
+    # Count success and error indicators in one scan (important for multipart)
+    counts = Counter(token.upper() for token in _RESPONSE_TOKEN_RE.findall(resp_clean))
+    cmgs_count = counts[b'+CMGS:']
+    ok_count = counts[b'OK']
+    error_count = counts[b'ERROR'] + counts[b'+CMS ERROR:']
+    
+    if cmgs_count and error_count == 0:
+        # Definitive success - modem returned message ID(s) and no errors
+        logger.debug("Success: %d +CMGS found in response, no errors", cmgs_count)
+        return True, None
+    
+    if error_count > 0:
+        # Definitive failure - actual error from modem
+        error_msg = resp_clean.decode('utf-8', errors='ignore')
+        logger.debug("Failure: %d ERROR(s) found - %s", error_count, error_msg)
+        return False, error_msg
+    
+    if ok_count and len(resp_clean) > 2:
+        # OK with some content - likely success
+        logger.debug("Success: OK found in response with content")
+        return True, None
+    
+    if len(resp_clean) == 0:
+        # Empty response - modem didn't respond, assume failure on timeout
+        logger.debug("Failure: Empty response (timeout)")
+        return False, f"No response from modem (timeout after {modem_timeout}s)"
+    
+    # Response received but ambiguous - check length
+    if len(resp_clean) > 5:
+        # Got substantial response, likely success
+        logger.debug("Success: Substantial response (%d bytes), assuming sent", len(resp_clean))
+        return True, None
+    
+    # Very short response - ambiguous
+    error_msg = f"Ambiguous modem response: {resp_clean[:50].decode('utf-8', errors='ignore')}"
+    logger.debug("Failure: Ambiguous - %s", error_msg)
+    return False, error_msg
+
+
+def _update_outbox_result(updates, msg_id, success, err255, attempts_left):
+    """
+    Queue the outbox update for one message.
+    
+    Args:
+        updates: _OutboxUpdates collecting the batch
+        msg_id: Outbox message ID
+        success: Whether the SMS was sent
+        err255: Error message, already truncated to 255 characters
+        attempts_left: Attempts remaining before this send
+    
+    Returns:
+        int: Attempts remaining after this send (0 or less means failed)
+    """
+    if success:
+        updates.sent_ids.append(msg_id)
+        return attempts_left
+    
+    # SMS failed, decrement attempts; out of attempts marks it as failed,
+    # otherwise it stays pending for a retry
+    new_attempts = attempts_left - 1
+    status = 'failed' if new_attempts <= 0 else 'pending'
+    updates.failed_rows.append((status, new_attempts, err255, msg_id))
+    return new_attempts
+
+
+def _process_batch(cursor, updates, send_fn, strict_durability, batch_size):
+    """
+    Send one batch of pending SMS (shared by process_pending_sms*).
+    
+    Messages stay locked until their results are committed. They are locked
+    and committed in groups of at most MAX_UNCOMMITTED (one in strict mode),
+    so a commit never releases rows this worker is still going to send. A
+    group that takes longer than MAX_UNCOMMITTED_SECONDS is committed early;
+    its unsent rows are unlocked by that commit and fetched again. Messages
+    that fail stay pending for a later call rather than being retried here.
+    
+    Args:
+        cursor: MySQL cursor
+        updates: _OutboxUpdates for the borrowed connection
+        send_fn: Callable (phone, text) -> (success: bool, error_message: str)
+        strict_durability: One message per transaction instead of up to MAX_UNCOMMITTED
+        batch_size: Maximum number of messages to send
+    
+    Returns:
+        int: Number of messages sent successfully
+    """
+    per_transaction = 1 if strict_durability else MAX_UNCOMMITTED
+    attempted = 0
+    sent = 0
+    last_id = 0  # Highest id tried so far; rows come back in id order
+    
+    while attempted < batch_size:
+        limit = min(per_transaction, batch_size - attempted)
+        messages = _lock_pending(cursor, last_id, limit)
+        if not messages:
+            break
+        
+        deadline = time.monotonic() + MAX_UNCOMMITTED_SECONDS
+        for message in messages:
+            if _send_message(updates, send_fn, message):
+                sent += 1
+            attempted += 1
+            last_id = message[0]
+            if time.monotonic() >= deadline:
+                break
+        
+        # Commit the results, which also releases the locks
+        updates.flush()
+        
+        if len(messages) < limit:
+            break  # Nothing else is pending
+    
+    return sent
+
+
+def _lock_pending(cursor, last_id, limit):
+    """
+    Lock up to limit pending messages after last_id that still have attempts
+    remaining and did not fail within the last RETRY_DELAY seconds.
+    
+    Rows already locked by another worker are skipped instead of waited on.
+    
+    Returns:
+        list: (id, phone_number, recipient, message, attempts) rows, empty on error
+    """
     try:
-        query = "SELECT * FROM outbox WHERE status='pending' AND attempts > 0 ORDER BY id LIMIT 5"
-        logger.debug(f"Executing query: {query}")
-        cursor.execute(query)
+        logger.debug("Executing query: %s", PENDING_SMS_QUERY)
+        cursor.execute(PENDING_SMS_QUERY, (last_id, RETRY_DELAY, limit))
         messages = cursor.fetchall()
-        logger.debug(f"Query returned {len(messages)} row(s)")
+        logger.debug("Query returned %d row(s)", len(messages))
     except Exception as e:
         logger.error(f"Failed to fetch pending messages: {e}")
-        return cursor
-    
-    if messages:
-        logger.debug(f"Found {len(messages)} pending message(s)")
-        for msg in messages:
-            logger.debug(f"  - ID: {msg['id']}, Phone: {msg['phone_number']}, Status: {msg['status']}, Attempts: {msg['attempts']}")
-    else:
-        logger.debug("No pending messages found in this cycle")
-    
-    for msg in messages:
-        msg_id = msg['id']
-        phone = msg['phone_number']
-        recipient = msg['recipient']
-        text = msg['message']
-        attempts_left = msg['attempts']
-        
-        logger.info(f"Sending SMS {msg_id} -> {recipient} ({phone}) [Attempts left: {attempts_left}]")
-        
-        import time
-        send_start = time.time()
-        try:
-            resp = send_sms_func(ser, phone, text, modem_timeout)
-            send_duration = time.time() - send_start
-            logger.debug(f"Modem full response for SMS {msg_id}: {repr(resp.strip())}")
+        return []
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        if messages:
+            logger.debug("Found %d pending message(s)", len(messages))
+            for msg_id, phone, _, _, attempts_left in messages:
+                logger.debug("  - ID: %s, Phone: %s, Attempts: %s", msg_id, phone, attempts_left)
+        else:
+            logger.debug("No pending messages found in this cycle")
+    
+    return messages
 
-            # Check if SMS was sent successfully
-            # For multipart SMS, we need to check if all parts succeeded
-            # Success indicators: +CMGS: (with message ID) or just OK
-            # Failure indicators: ERROR, +CMS ERROR, timeout with no response
-            is_success = False
-            error_msg = None
-            
-            # Clean up the response for checking
-            resp_clean = resp.strip().upper()
-            
-            # Count success and error indicators (important for multipart)
-            cmgs_count = resp_clean.count('+CMGS:')
-            ok_count = resp_clean.count('OK')
-            error_count = resp_clean.count('ERROR')
-            
-            if '+CMGS:' in resp_clean and error_count == 0:
-                # Definitive success - modem returned message ID(s) and no errors
-                is_success = True
-                logger.debug(f"Success: {cmgs_count} +CMGS found in response, no errors")
-            elif error_count > 0 or '+CMS ERROR:' in resp_clean:
-                # Definitive failure - actual error from modem
-                is_success = False
-                error_msg = resp.strip()[:255]
-                logger.debug(f"Failure: {error_count} ERROR(s) found - {error_msg}")
-            elif 'OK' in resp_clean and len(resp_clean) > 2:
-                # OK with some content - likely success
-                is_success = True
-                logger.debug("Success: OK found in response with content")
-            elif len(resp.strip()) == 0:
-                # Empty response - modem didn't respond
-                # Behavior controlled by config (imported in main)
-                # For now, assume failure on timeout
-                is_success = False
-                error_msg = f"No response from modem (timeout after {modem_timeout}s)"
-                logger.debug("Failure: Empty response (timeout)")
-            else:
-                # Response received but ambiguous - check length
-                if len(resp.strip()) > 5:
-                    # Got substantial response, likely success
-                    is_success = True
-                    logger.debug(f"Success: Substantial response ({len(resp)} chars), assuming sent")
-                else:
-                    # Very short response - ambiguous
-                    is_success = False
-                    error_msg = f"Ambiguous modem response: {resp.strip()[:50]}"
-                    logger.debug(f"Failure: Ambiguous - {error_msg}")
-            
-            if is_success:
-                cursor.execute(
-                    "UPDATE outbox SET status='sent', sent_at=NOW(), updated_at=NOW() WHERE id=%s",
-                    (msg_id,)
-                )
-                logger.info(f"[OK] SMS {msg_id} sent successfully to {phone} (took {send_duration:.1f}s)")
-            else:
-                # SMS failed, decrement attempts
-                new_attempts = attempts_left - 1
-                final_error = error_msg or resp.strip()[:255] or "Unknown error"
-                
-                if new_attempts <= 0:
-                    # No more attempts, mark as failed
-                    cursor.execute(
-                        "UPDATE outbox SET status='failed', attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
-                        (new_attempts, final_error, msg_id)
-                    )
-                    logger.error(f"[FAIL] SMS {msg_id} FAILED - No attempts remaining. Error: {final_error}")
-                else:
-                    # Still have attempts, keep as pending
-                    cursor.execute(
-                        "UPDATE outbox SET attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
-                        (new_attempts, final_error, msg_id)
-                    )
-                    logger.warning(f"[RETRY] SMS {msg_id} failed - {new_attempts} attempts remaining. Error: {final_error}")
-            
-            db.commit()
 
-        except Exception as e:
-            # Exception occurred, decrement attempts
-            logger.exception(f"Exception sending SMS {msg_id}: {e}")
-            new_attempts = attempts_left - 1
-            
-            if new_attempts <= 0:
-                # No more attempts, mark as failed
-                cursor.execute(
-                    "UPDATE outbox SET status='failed', attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
-                    (new_attempts, str(e)[:255], msg_id)
-                )
-                logger.error(f"[FAIL] SMS {msg_id} FAILED - No attempts remaining (Exception)")
-            else:
-                # Still have attempts, keep as pending
-                cursor.execute(
-                    "UPDATE outbox SET attempts=%s, error_message=%s, updated_at=NOW() WHERE id=%s",
-                    (new_attempts, str(e)[:255], msg_id)
-                )
-                logger.warning(f"[RETRY] SMS {msg_id} error - {new_attempts} attempts remaining (Exception)")
-            
-            db.commit()
-    
-    # Return the cursor (might be a new one)
-    return cursor
+def _send_message(updates, send_fn, message):
+    """
+    Send one locked message and queue its outbox update.
+    
+    Args:
+        updates: _OutboxUpdates for the borrowed connection
+        send_fn: Callable (phone, text) -> (success: bool, error_message: str)
+        message: Row from _lock_pending, in PENDING_SMS_QUERY column order
+    
+    Returns:
+        bool: Whether the SMS was sent
+    """
+    msg_id, phone, recipient, text, attempts_left = message
+    
+    logger.info(f"Sending SMS {msg_id} -> {recipient} ({phone}) [Attempts left: {attempts_left}]")
+    
+    send_start = time.time()
+    try:
+        success, result_msg = send_fn(phone, text)
+        send_duration = time.time() - send_start
+        
+        err255 = None if success else (result_msg or "Unknown error")[:255]
+        new_attempts = _update_outbox_result(updates, msg_id, success, err255, attempts_left)
+        
+        if success:
+            logger.info(f"[OK] SMS {msg_id} sent successfully to {phone} (took {send_duration:.1f}s)")
+        elif new_attempts <= 0:
+            logger.error(f"[FAIL] SMS {msg_id} FAILED - No attempts remaining. Error: {err255}")
+        else:
+            logger.warning(f"[RETRY] SMS {msg_id} failed - {new_attempts} attempts remaining. Error: {err255}")
+        
+        return success
+    
+    except Exception as e:
+        # Exception occurred, decrement attempts
+        logger.exception(f"Exception sending SMS {msg_id}: {e}")
+        new_attempts = _update_outbox_result(updates, msg_id, False, str(e)[:255], attempts_left)
+        
+        if new_attempts <= 0:
+            logger.error(f"[FAIL] SMS {msg_id} FAILED - No attempts remaining (Exception)")
+        else:
+            logger.warning(f"[RETRY] SMS {msg_id} error - {new_attempts} attempts remaining (Exception)")
+        
+        return False
 
 
-def connect_database(config):
+def connect_database(config, pool_size=2):
     """
-    Connect to MySQL database with proper configuration.
+    Create a MySQL connection pool with proper configuration.
     
     Args:
         config: Database configuration dictionary
+        pool_size: Number of connections kept open in the pool
     
     Returns:
-        tuple: (connection, cursor)
+        MySQLConnectionPool: Pool to pass to process_pending_sms*
     """
-    db = mysql.connector.connect(**config, autocommit=False)
-    
-    # Set isolation level to READ COMMITTED to avoid stale reads
-    cursor = db.cursor()
-    cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
-    cursor.close()
-    
-    cursor = db.cursor(dictionary=True)
+    pool = pooling.MySQLConnectionPool(
+        pool_name='sms',
+        pool_size=pool_size,
+        # Keep session settings between checkouts (no COM_RESET_CONNECTION)
+        pool_reset_session=False,
+        autocommit=False,
+        # Runs on every physical (re)connect: READ COMMITTED avoids stale reads
+        init_command="SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED",
+        **config
+    )
     logger.info(f"Connected to MySQL database '{config['database']}' at {config['host']}")
     
-    return db, cursor
+    return pool
@@ -5,21 +5,37 @@ Handles character encoding detection, message size calculation,
 and message splitting for SMS.
 """
 
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate
 
+# GSM 7-bit basic character set
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# GSM 7-bit extended characters (count as 2 characters each)
+GSM7_EXTENDED = frozenset("^{}\\[~]|€")
+# Every character that can be sent as GSM 7-bit
+GSM7_CHARS = GSM7_BASIC | GSM7_EXTENDED
+
+# str.translate() tables that delete GSM7 characters, so whole-string checks
+# run in C instead of a per-character Python loop
+_GSM7_DELETE_TABLE = str.maketrans('', '', ''.join(GSM7_CHARS))
+_GSM7_EXTENDED_DELETE_TABLE = str.maketrans('', '', ''.join(GSM7_EXTENDED))
+# Maps each GSM7 character to its length in septets (as a 1-byte string)
+_GSM7_WEIGHT_TABLE = str.maketrans({
+    **dict.fromkeys(GSM7_BASIC, '\x01'),
+    **dict.fromkeys(GSM7_EXTENDED, '\x02'),
+})
+
+
+@lru_cache(maxsize=1024)
 def is_gsm7_compatible(text):
     """Check if text contains only GSM 7-bit characters."""
-    # GSM 7-bit basic character set
-    gsm7_basic = (
-        "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
-        "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
-    )
-    # GSM 7-bit extended characters (count as 2 characters each)
-    gsm7_extended = "^{}\\[~]|€"
-    
-    for char in text:
-        if char not in gsm7_basic and char not in gsm7_extended:
-            return False
-    return True
+    # Nothing left after deleting every GSM7 character
+    return not text.translate(_GSM7_DELETE_TABLE)
 
 
 def calculate_sms_parts(text):
@@ -39,8 +55,8 @@ def calculate_sms_parts(text):
     if is_gsm7_compatible(text):
         encoding = 'GSM7'
         # Calculate length considering extended characters count as 2
-        gsm7_extended = "^{}\\[~]|€"
-        char_count = sum(2 if c in gsm7_extended else 1 for c in text)
+        extended_count = len(text) - len(text.translate(_GSM7_EXTENDED_DELETE_TABLE))
+        char_count = len(text) + extended_count
         
         # Single SMS: 160 chars, Multipart SMS: 153 chars per part
         if char_count <= 160:
@@ -71,30 +87,73 @@ def split_message(text, chars_per_part):
     Returns:
         list: List of message parts
     """
+    if is_gsm7_compatible(text):
+        # GSM7: need to account for extended chars counting as 2
+        return _split_gsm7(text, chars_per_part)
+    
+    # UCS2: simple character-based split
+    return [text[i:i + chars_per_part] for i in range(0, len(text), chars_per_part)]
+
+
+def _split_gsm7(text, chars_per_part):
+    """Greedily split GSM7 text into parts, counting extended chars as 2."""
+    if len(text.translate(_GSM7_EXTENDED_DELETE_TABLE)) == len(text):
+        # No extended characters, so plain slicing is exact
+        return [text[i:i + chars_per_part] for i in range(0, len(text), chars_per_part)]
+    
+    # Running septet total after each character, built in C
+    totals = list(accumulate(text.translate(_GSM7_WEIGHT_TABLE).encode('latin-1')))
+    
     parts = []
-    gsm7_extended = "^{}\\[~]|€"
+    start = 0
+    while start < len(text):
+        # Last character whose total still fits in this part
+        base = totals[start - 1] if start else 0
+        end = max(bisect_right(totals, base + chars_per_part, start), start + 1)
+        parts.append(text[start:end])
+        start = end
+    
+    return parts
+
+
+# Result of analyze_and_split()
+MessageAnalysis = namedtuple(
+    'MessageAnalysis', ['encoding', 'char_count', 'num_parts', 'parts']
+)
+
+
+def analyze_and_split(text):
+    """
+    Detect encoding, count characters and split the message in one call.
+    
+    Equivalent to calling calculate_sms_parts() followed by split_message(),
+    without repeating the encoding check or the length count.
+    
+    Args:
+        text: The message text to analyze
     
+    Returns:
+        MessageAnalysis: (encoding, char_count, num_parts, parts)
+            - encoding: 'GSM7' or 'UCS2'
+            - char_count: Length in encoding units (GSM7 extended chars count 2)
+            - num_parts: Number of SMS parts needed
+            - parts: List of message parts
+    """
     if is_gsm7_compatible(text):
-        # GSM7: need to account for extended chars counting as 2
-        current_part = ""
-        current_length = 0
+        # Calculate length considering extended characters count as 2
+        extended_count = len(text) - len(text.translate(_GSM7_EXTENDED_DELETE_TABLE))
+        char_count = len(text) + extended_count
         
-        for char in text:
-            char_length = 2 if char in gsm7_extended else 1
-            
-            if current_length + char_length <= chars_per_part:
-                current_part += char
-                current_length += char_length
-            else:
-                parts.append(current_part)
-                current_part = char
-                current_length = char_length
+        if char_count <= 160:
+            return MessageAnalysis('GSM7', char_count, 1, [text] if text else [])
         
-        if current_part:
-            parts.append(current_part)
-    else:
-        # UCS2: simple character-based split
-        for i in range(0, len(text), chars_per_part):
-            parts.append(text[i:i + chars_per_part])
+        parts = _split_gsm7(text, 153)
+        return MessageAnalysis('GSM7', char_count, len(parts), parts)
     
-    return parts
+    # UCS2: simple character-based split
+    char_count = len(text)
+    if char_count <= 70:
+        return MessageAnalysis('UCS2', char_count, 1, [text])
+    
+    parts = [text[i:i + 67] for i in range(0, char_count, 67)]
+    return MessageAnalysis('UCS2', char_count, len(parts), parts)
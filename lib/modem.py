@@ -5,118 +5,181 @@ Handles all direct modem communication for sending SMS messages.
 Supports both single and multipart SMS using PDU mode.
 """
 
+import re
 import time
 import random
+import itertools
 import logging
-from .encoding import calculate_sms_parts, split_message
-from .pdu import create_pdu
+from .encoding import analyze_and_split
+from .pdu import encode_address, create_pdu
 
 # Get logger
 logger = logging.getLogger('SMSDaemon')
 
+# Serial read timeout used while talking to the modem; reads return as soon
+# as data arrives, this only bounds how long a single read blocks
+READ_TIMEOUT = 0.05
+
+# Unsolicited status reports (Huawei-style ^XXX: lines) that can arrive in
+# the middle of a command response
+_URC_RE = re.compile(rb'\^(?:RSSI|DSFLOWRPT|CSNR|HCSQ|MODE|SRVST|BOOT|CEND|CONN|ORIG):')
+
+# Multipart reference numbers count up from a random start. The counter is
+# shared by every session, so consecutive messages never share one even when
+# callers pass a plain serial connection (which gets a new session each time)
+_ref_counter = itertools.count(random.randint(0, 255))
+
+
+def _read_lines(ser, timeout):
+    """
+    Yield complete modem response lines as they arrive.
+    
+    Each read blocks only until the next CRLF (or the short serial timeout),
+    so lines are handed over the moment the modem sends them.
+    
+    Args:
+        ser: Serial connection to modem
+        timeout: Overall time limit in seconds
+    
+    Yields:
+        bytes: Response line including its CRLF (the last one may be partial)
+    """
+    pending = bytearray()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        pending.extend(ser.read_until(b'\r\n'))
+        if pending.endswith(b'\r\n'):
+            yield bytes(pending)
+            pending.clear()
+    if pending:
+        yield bytes(pending)
+
+
+def _send_command(ser, command, timeout=1):
+    """Send an AT command and wait for its OK/ERROR result (or timeout)."""
+    ser.write(command)
+    for line in _read_lines(ser, timeout):
+        line = line.strip()
+        if line == b'OK' or b'ERROR' in line:
+            return line
+    return b''
+
+
+def _is_unsolicited(line):
+    """Check if a response line is an unsolicited status report."""
+    return _URC_RE.match(line) is not None
+
+
+class ModemSession:
+    """
+    Serial connection to a modem plus the AT settings already applied to it.
+    
+    The modem keeps echo and message format settings between commands, so
+    they are only sent until the modem has acknowledged them once.
+    """
+    
+    def __init__(self, ser):
+        """
+        Args:
+            ser: Serial connection to modem
+        """
+        self.ser = ser
+        self.echo_off = False
+        self.pdu_mode = False
+    
+    def ensure_pdu_mode(self):
+        """Disable echo and select PDU mode unless already done."""
+        if not self.echo_off:
+            # Disable echo to reduce noise
+            self.echo_off = _send_command(self.ser, b'ATE0\r') == b'OK'
+        if not self.pdu_mode:
+            # Set PDU mode
+            self.pdu_mode = _send_command(self.ser, b'AT+CMGF=0\r') == b'OK'
+    
+    def next_ref(self):
+        """Return the reference number for the next multipart message (0-255)."""
+        return next(_ref_counter) & 0xFF
+    
+    def reset(self):
+        """Forget the cached settings so they are sent again next time."""
+        self.echo_off = False
+        self.pdu_mode = False
+
+
+def _as_session(ser):
+    """Wrap a plain serial connection in a ModemSession if needed."""
+    return ser if isinstance(ser, ModemSession) else ModemSession(ser)
+
 
 def send_sms_pdu(ser, pdu_hex, tpdu_len, modem_timeout=3):
     """
     Send SMS using PDU mode.
     
+    Sets a short read timeout on ser; every wait below is bounded by its own
+    deadline and returns as soon as the modem answers.
+    
     Args:
-        ser: Serial connection to modem
+        ser: ModemSession, or a serial connection to modem
         pdu_hex: PDU data as hex string
         tpdu_len: TPDU length
         modem_timeout: Response timeout in seconds
     
     Returns:
-        str: Modem response
+        bytes: Raw modem response
     """
-    # Disable echo to reduce noise
-    ser.write(b'ATE0\r')
-    time.sleep(0.3)
-    ser.flushInput()
+    session = _as_session(ser)
+    ser = session.ser
+    if ser.timeout != READ_TIMEOUT:
+        ser.timeout = READ_TIMEOUT
     
-    # Set PDU mode
-    ser.write(b'AT+CMGF=0\r')
-    time.sleep(0.3)
-    ser.flushInput()
+    session.ensure_pdu_mode()
     
-    # Send PDU length command
+    # Send PDU length command and wait for the "> " prompt
     cmd = f'AT+CMGS={tpdu_len}\r'.encode()
     ser.write(cmd)
-    time.sleep(0.5)  # Wait a bit longer for prompt
-    
-    # Clear any unsolicited messages before sending PDU
-    ser.flushInput()
+    prompt = bytearray()
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        prompt.extend(ser.read_until(b'> '))
+        if prompt.endswith(b'> ') or b'ERROR' in prompt:
+            break
+    if b'ERROR' in prompt:
+        logger.debug("AT+CMGS rejected: %r", bytes(prompt))
+        # The modem may have been reset or reconfigured; set it up again next time
+        session.reset()
+        return bytes(prompt)
     
     # Send PDU data and Ctrl+Z
     ser.write(pdu_hex.encode() + b'\x1A')
     
-    # Wait a moment for modem to start processing
-    time.sleep(0.5)
-    # Wait a moment for modem to start processing
-    time.sleep(0.5)
-    
-    # Wait for response (filtering out unsolicited messages)
-    response_parts = []
-    max_wait = modem_timeout
+    # Wait for the final result, line by line (filtering out unsolicited messages)
+    response = bytearray()
     start_time = time.time()
-    last_data_time = time.time()
-    idle_timeout = 2  # Increased to handle unsolicited messages
-    got_any_data = False
-    got_success = False
-    
-    while (time.time() - start_time) < max_wait:
-        time.sleep(0.1)
-        if ser.in_waiting > 0:
-            chunk = ser.read_all().decode(errors='ignore')
-            response_parts.append(chunk)
-            last_data_time = time.time()
-            got_any_data = True
-            
-            # Filter out unsolicited messages for logging
-            filtered_chunk = chunk
-            if '^RSSI:' not in chunk and '^DSFLOWRPT:' not in chunk:
-                logger.debug(f"Modem chunk received: {repr(chunk)}")
-            
-            # Check the full response
-            full_response = ''.join(response_parts)
-            
-            # Check for success indicators
-            if '+CMGS:' in full_response:
-                got_success = True
-                logger.debug("Success indicator (+CMGS:) found in response")
-                # Wait a bit more to capture complete response
-                time.sleep(0.3)
-                if ser.in_waiting > 0:
-                    final_chunk = ser.read_all().decode(errors='ignore')
-                    response_parts.append(final_chunk)
-                break
-            elif 'OK' in full_response and not got_success:
-                # OK found, check if it's for our SMS or just from AT commands
-                lines = full_response.split('\r\n')
-                ok_count = sum(1 for line in lines if line.strip() == 'OK')
-                if ok_count >= 1:  # At least one OK (could be from PDU mode + send)
-                    got_success = True
-                    logger.debug("Success indicator (OK) found in response")
-                    # Wait a bit more to capture complete response
-                    time.sleep(0.3)
-                    if ser.in_waiting > 0:
-                        final_chunk = ser.read_all().decode(errors='ignore')
-                        response_parts.append(final_chunk)
-                    break
-            elif 'ERROR' in full_response or '+CMS ERROR:' in full_response:
-                logger.debug("Error indicator found in response")
-                break
-        else:
-            # No data waiting - check if we've been idle too long after getting some data
-            if got_any_data and (time.time() - last_data_time) > idle_timeout:
-                if got_success:
-                    logger.debug(f"Got success, idle timeout ({idle_timeout}s), considering complete")
-                else:
-                    logger.debug(f"Idle timeout ({idle_timeout}s) after receiving data")
-                break
-    
-    resp = ''.join(response_parts)
-    elapsed = time.time() - start_time
-    logger.debug(f"Response collection took {elapsed:.1f}s, got {len(resp)} chars")
+    
+    for line in _read_lines(ser, modem_timeout):
+        stripped = line.strip()
+        if not stripped or _is_unsolicited(stripped):
+            continue
+        
+        response.extend(line)
+        logger.debug("Modem line received: %r", line)
+        
+        if stripped.startswith(b'+CMGS:'):
+            # Success indicator; keep reading for the trailing OK
+            logger.debug("Success indicator (+CMGS:) found in response")
+        elif stripped == b'OK':
+            logger.debug("Final OK received")
+            break
+        elif b'ERROR' in stripped:
+            logger.debug("Error indicator found in response")
+            if stripped.startswith(b'+CMS ERROR'):
+                session.reset()
+            break
+    
+    resp = bytes(response)
+    if logger.isEnabledFor(logging.DEBUG):
+        elapsed = time.time() - start_time
+        logger.debug("Response collection took %.1fs, got %d bytes", elapsed, len(resp))
     return resp
 
 
@@ -125,41 +188,49 @@ def send_sms(ser, number, text, modem_timeout=3):
     Send SMS using PDU mode with multipart support.
     Messages are automatically combined by the recipient's phone.
     
+    Pass a ModemSession to keep the echo/PDU mode setup across messages;
+    a plain serial connection is set up once per message.
+    
     Args:
-        ser: Serial connection to modem
+        ser: ModemSession, or a serial connection to modem
         number: Destination phone number
         text: Message text
         modem_timeout: Response timeout in seconds
     
     Returns:
-        str: Combined modem response(s)
+        bytes: Combined raw modem response(s)
     """
-    # Calculate if message needs to be split
-    num_parts, chars_per_part, encoding = calculate_sms_parts(text)
+    session = _as_session(ser)
+    
+    # Detect encoding and split the message in one call
+    encoding, char_count, num_parts, message_parts = analyze_and_split(text)
+    
+    logger.debug("Message analysis: %d chars (%d %s units), parts=%d",
+                 len(text), char_count, encoding, num_parts)
     
-    logger.debug(f"Message analysis: {len(text)} chars, encoding={encoding}, parts={num_parts}, limit={chars_per_part}")
+    # Reference number for this message (for multipart grouping)
+    ref_num = session.next_ref()
     
-    # Generate a random reference number for this message (for multipart grouping)
-    ref_num = random.randint(0, 255)
+    # The destination address is the same for every part
+    address = encode_address(number)
     
     if num_parts == 1:
         # Single SMS
         logger.debug("Sending as single SMS (PDU mode)")
-        pdu_hex, tpdu_len = create_pdu(number, text, ref_num, 1, 1)
-        logger.debug(f"PDU: {pdu_hex}, TPDU length: {tpdu_len}")
-        return send_sms_pdu(ser, pdu_hex, tpdu_len, modem_timeout)
+        pdu_hex, tpdu_len = create_pdu(number, text, ref_num, 1, 1, encoding, address)
+        logger.debug("PDU: %s, TPDU length: %d", pdu_hex, tpdu_len)
+        return send_sms_pdu(session, pdu_hex, tpdu_len, modem_timeout)
     else:
         # Multipart SMS - split and send each part
         logger.info(f"Sending as multipart SMS: {num_parts} parts (PDU mode with UDH)")
-        message_parts = split_message(text, chars_per_part)
         
         all_responses = []
         for i, part in enumerate(message_parts, 1):
-            logger.debug(f"Sending part {i}/{num_parts}: {len(part)} chars")
-            pdu_hex, tpdu_len = create_pdu(number, part, ref_num, i, num_parts)
-            logger.debug(f"PDU part {i}: {pdu_hex[:50]}..., TPDU length: {tpdu_len}")
+            logger.debug("Sending part %d/%d: %d chars", i, num_parts, len(part))
+            pdu_hex, tpdu_len = create_pdu(number, part, ref_num, i, num_parts, encoding, address)
+            logger.debug("PDU part %d: %.50s..., TPDU length: %d", i, pdu_hex, tpdu_len)
             
-            response = send_sms_pdu(ser, pdu_hex, tpdu_len, modem_timeout)
+            response = send_sms_pdu(session, pdu_hex, tpdu_len, modem_timeout)
             all_responses.append(response)
             
             # Small delay between parts
@@ -167,6 +238,6 @@ def send_sms(ser, number, text, modem_timeout=3):
                 time.sleep(0.5)
         
         # Return combined responses
-        combined_response = '\n'.join(all_responses)
-        logger.debug(f"All {num_parts} parts sent. Combined response: {repr(combined_response)}")
+        combined_response = b'\n'.join(all_responses)
+        logger.debug("All %d parts sent. Combined response: %r", num_parts, combined_response)
         return combined_response
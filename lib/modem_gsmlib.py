@@ -35,6 +35,8 @@ class ModemSMS:
             self.modem = GsmModem(self.port, self.baudrate)
             logger.info(f"Connecting to modem on {self.port} at {self.baudrate} baud...")
             self.modem.connect()
+            self._enable_low_latency()
+            self._enlarge_buffers()
             
             # Log modem info
             manufacturer = self.modem.manufacturer
@@ -56,6 +58,31 @@ class ModemSMS:
             logger.error(f"Failed to connect to modem: {e}")
             return False
     
+    def _enable_low_latency(self):
+        """Ask the serial driver to deliver bytes immediately (Linux only)"""
+        # USB-serial adapters batch incoming bytes for up to 16ms by default;
+        # low-latency mode drops that to ~1ms for every modem response
+        try:
+            self.modem.serial.set_low_latency_mode(True)
+            logger.debug("Serial low-latency mode enabled")
+        except (AttributeError, NotImplementedError):
+            logger.debug("Serial low-latency mode not supported on this platform")
+        except (OSError, ValueError) as e:
+            # Driver refused it or insufficient permissions
+            logger.warning(f"Could not enable serial low-latency mode: {e}")
+    
+    def _enlarge_buffers(self):
+        """Give the serial driver room for bursts of modem output (Windows only)"""
+        # The default Windows driver queue is small; a larger one lets bursts
+        # of status reports arrive in a single read instead of many
+        try:
+            self.modem.serial.set_buffer_size(rx_size=65536, tx_size=4096)
+            logger.debug("Serial driver buffers enlarged")
+        except AttributeError:
+            pass  # Only pyserial's Windows backend supports this
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not enlarge serial driver buffers: {e}")
+    
     def disconnect(self):
         """Disconnect from the modem"""
         if self.modem:
@@ -80,12 +107,12 @@ class ModemSMS:
             return False, "Modem not connected"
         
         try:
-            logger.debug(f"Sending SMS to {number}: {text[:50]}...")
+            logger.debug("Sending SMS to %s: %.50s...", number, text)
             
             # Send SMS (library handles multipart automatically)
             sms = self.modem.sendSms(number, text, waitForDeliveryReport=False)
             
-            logger.debug(f"SMS sent successfully, reference: {sms.reference if hasattr(sms, 'reference') else 'N/A'}")
+            logger.debug("SMS sent successfully, reference: %s", getattr(sms, 'reference', 'N/A'))
             return True, "SMS sent successfully"
             
         except TimeoutException as e:
@@ -134,11 +161,11 @@ def send_sms(modem_wrapper, number, text, modem_timeout=30):
         modem_timeout: Timeout (ignored, uses modem_wrapper timeout)
         
     Returns:
-        str: Status message
+        bytes: Status message in raw modem response form
     """
     success, message = modem_wrapper.send_sms(number, text)
     
     if success:
-        return "+CMGS: OK"  # Simulate success response
+        return b"+CMGS: OK"  # Simulate success response
     else:
-        return f"ERROR: {message}"
+        return f"ERROR: {message}".encode('utf-8')
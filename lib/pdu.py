@@ -5,115 +5,86 @@ Handles GSM 7-bit encoding and PDU format creation for SMS messages.
 Supports both single and multipart SMS with concatenation headers.
 """
 
+import re
+
 from .encoding import is_gsm7_compatible
 
+# Everything that is not an ASCII digit or '+' in a phone number
+_PHONE_STRIP_RE = re.compile(r'[^0-9+]')
+
+# GSM 7-bit default alphabet in code order. Position 0x1B is the escape to
+# the extension table, so no character maps to it.
+_GSM7_BASIC = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞ\x1bÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+_GSM7_INDEX = {char: i for i, char in enumerate(_GSM7_BASIC) if i != 0x1B}
+
+# GSM 7-bit extension table (sent as ESC + code)
+_GSM7_EXT = {
+    '\f': 0x0A, '^': 0x14, '{': 0x28, '}': 0x29, '\\': 0x2F,
+    '[': 0x3C, '~': 0x3D, ']': 0x3E, '|': 0x40, '€': 0x65
+}
 
-def encode_gsm7(text):
+
+def _to_septets(text):
     """
-    Encode text to GSM 7-bit format (septets packed into octets).
+    Convert text to GSM 7-bit septet values.
     
     Args:
-        text: Text to encode
+        text: Text to convert
     
     Returns:
-        bytes: Encoded data as bytes
+        bytearray: One septet per byte (extended chars take two)
     """
-    # GSM 7-bit character table
-    gsm7_basic = (
-        "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
-        "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
-    )
-    gsm7_extended = {
-        '\f': 0x0A, '^': 0x14, '{': 0x28, '}': 0x29, '\\': 0x2F,
-        '[': 0x3C, '~': 0x3D, ']': 0x3E, '|': 0x40, '€': 0x65
-    }
-    
-    # Convert to septet values
-    septets = []
+    septets = bytearray()
+    append = septets.append
     for char in text:
-        if char in gsm7_extended:
-            septets.append(0x1B)  # ESC character
-            septets.append(gsm7_extended[char])
+        ext = _GSM7_EXT.get(char)
+        if ext is not None:
+            append(0x1B)  # ESC character
+            append(ext)
         else:
-            try:
-                septets.append(gsm7_basic.index(char))
-            except ValueError:
-                septets.append(0x3F)  # '?' as fallback
-    
-    # Pack 7-bit septets into 8-bit octets
-    octets = []
-    shift = 0
-    carry = 0
-    
-    for i, septet in enumerate(septets):
-        if shift == 7:
-            shift = 0
-            carry = 0
-            continue
-        
-        octet = ((septet << shift) | carry) & 0xFF
-        octets.append(octet)
-        carry = septet >> (7 - shift)
-        shift += 1
-        
-        if i == len(septets) - 1 and carry:
-            octets.append(carry)
+            append(_GSM7_INDEX.get(char, 0x3F))  # '?' as fallback
+    return septets
+
+
+def _pack_septets(septets, padding_bits):
+    """
+    Pack 7-bit septets into 8-bit octets, least significant bit first.
+    
+    Args:
+        septets: Septet values from _to_septets()
+        padding_bits: Fill bits before the first septet (for UDH alignment)
+    
+    Returns:
+        bytes: Packed data
+    """
+    if not septets:
+        return b''
+    
+    # Build the whole bit stream in one int, then let to_bytes() split it
+    acc = 0
+    nbits = padding_bits
+    for septet in septets:
+        acc |= septet << nbits
+        nbits += 7
     
-    return bytes(octets)
+    return acc.to_bytes((nbits + 7) // 8, 'little')
 
 
-def encode_gsm7_with_padding(text, padding_bits):
+def encode_gsm7(text, padding_bits=0):
     """
-    Encode GSM7 text with bit padding for UDH alignment.
+    Encode text to GSM 7-bit format (septets packed into octets).
     
     Args:
         text: Text to encode
-        padding_bits: Number of padding bits needed
+        padding_bits: Fill bits before the first septet (for UDH alignment)
     
     Returns:
-        bytes: Encoded data with padding
+        bytes: Encoded data as bytes
     """
-    gsm7_basic = (
-        "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
-        "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
-    )
-    gsm7_extended = {
-        '\f': 0x0A, '^': 0x14, '{': 0x28, '}': 0x29, '\\': 0x2F,
-        '[': 0x3C, '~': 0x3D, ']': 0x3E, '|': 0x40, '€': 0x65
-    }
-    
-    # Convert to septet values
-    septets = []
-    for char in text:
-        if char in gsm7_extended:
-            septets.append(0x1B)
-            septets.append(gsm7_extended[char])
-        else:
-            try:
-                septets.append(gsm7_basic.index(char))
-            except ValueError:
-                septets.append(0x3F)
-    
-    # Pack with padding
-    octets = []
-    shift = padding_bits
-    carry = 0
-    
-    for i, septet in enumerate(septets):
-        if shift == 7:
-            shift = 0
-            carry = 0
-            continue
-        
-        octet = ((septet << shift) | carry) & 0xFF
-        octets.append(octet)
-        carry = septet >> (7 - shift)
-        shift += 1
-        
-        if i == len(septets) - 1 and carry:
-            octets.append(carry)
-    
-    return bytes(octets)
+    return _pack_septets(_to_septets(text), padding_bits)
 
 
 def encode_phone_number(phone):
@@ -127,7 +98,7 @@ def encode_phone_number(phone):
         tuple: (type_of_number, encoded_phone_bytes)
     """
     # Remove any non-digit characters except '+'
-    phone = ''.join(c for c in phone if c.isdigit() or c == '+')
+    phone = _PHONE_STRIP_RE.sub('', phone)
     
     # Handle international format
     if phone.startswith('+'):
@@ -140,12 +111,33 @@ def encode_phone_number(phone):
     if len(phone) % 2:
         phone += 'F'
     
-    swapped = ''.join(phone[i+1] + phone[i] for i in range(0, len(phone), 2))
+    digits = bytearray(phone.encode('ascii'))
+    digits[::2], digits[1::2] = digits[1::2], digits[::2]
+    
+    return ton, bytes.fromhex(digits.decode('ascii'))
+
+
+def encode_address(phone):
+    """
+    Encode a destination address once so it can be reused for every part.
+    
+    Args:
+        phone: Phone number string (can include '+' for international)
+    
+    Returns:
+        tuple: (digit_count, type_of_number, encoded_phone_bytes)
+    """
+    ton, phone_encoded = encode_phone_number(phone)
+    
+    # Two digits per octet; an odd count ends with an 'F' filler nibble
+    digit_count = len(phone_encoded) * 2
+    if phone_encoded and phone_encoded[-1] >> 4 == 0xF:
+        digit_count -= 1
     
-    return ton, bytes.fromhex(swapped)
+    return digit_count, ton, phone_encoded
 
 
-def create_pdu(phone, text, ref_num, part_num, total_parts):
+def create_pdu(phone, text, ref_num, part_num, total_parts, encoding=None, address=None):
     """
     Create PDU for SMS with concatenation support.
     
@@ -155,100 +147,103 @@ def create_pdu(phone, text, ref_num, part_num, total_parts):
         ref_num: Reference number for multipart SMS (0-255)
         part_num: Current part number (1-based)
         total_parts: Total number of parts
+        encoding: 'GSM7' or 'UCS2' if already known for the whole message;
+            detected from text when None
+        address: Result of encode_address(phone), to skip re-encoding the
+            number for every part
     
     Returns:
         tuple: (pdu_hex_string, tpdu_length)
     """
     # Determine encoding
-    if is_gsm7_compatible(text):
+    if encoding is None:
+        encoding = 'GSM7' if is_gsm7_compatible(text) else 'UCS2'
+    
+    if encoding == 'GSM7':
         dcs = 0x00  # GSM 7-bit
-        user_data = encode_gsm7(text)
-        udl = len(text)  # User Data Length in septets for GSM7
+        septets = _to_septets(text)
+        udl = len(septets)  # User Data Length in septets for GSM7
     else:
         dcs = 0x08  # UCS2 (16-bit)
         user_data = text.encode('utf-16-be')
         udl = len(user_data)  # User Data Length in octets for UCS2
     
     # Encode phone number
-    ton, phone_encoded = encode_phone_number(phone)
-    phone_len = len(phone.replace('+', ''))
+    if address is None:
+        address = encode_address(phone)
+    phone_len, ton, phone_encoded = address
     
     # Build PDU
-    pdu = []
+    pdu = bytearray()
+    pdu_append = pdu.append
     
     # SMSC (use default, length = 0)
-    pdu.append(0x00)
+    pdu_append(0x00)
     
     # PDU type (SMS-SUBMIT with UDH for multipart)
     if total_parts > 1:
         pdu_type = 0x41  # SMS-SUBMIT + UDHI (User Data Header Indicator)
     else:
         pdu_type = 0x01  # SMS-SUBMIT
-    pdu.append(pdu_type)
+    pdu_append(pdu_type)
     
     # Message reference (0x00 = let modem set)
-    pdu.append(0x00)
+    pdu_append(0x00)
     
     # Destination address length
-    pdu.append(phone_len)
+    pdu_append(phone_len)
     
     # Type of number
-    pdu.append(ton)
+    pdu_append(ton)
     
     # Phone number (swapped)
     pdu.extend(phone_encoded)
     
     # Protocol identifier
-    pdu.append(0x00)
+    pdu_append(0x00)
     
     # Data coding scheme
-    pdu.append(dcs)
+    pdu_append(dcs)
     
     # Validity period (not used, but can add 0xAA for 4 days)
     # pdu.append(0xAA)
     
     # User Data Header (for multipart)
     if total_parts > 1:
-        udh = []
-        udh.append(0x00)  # IEI: Concatenated short messages, 8-bit reference
-        udh.append(0x03)  # IEDL: Length of header data
-        udh.append(ref_num & 0xFF)  # Reference number (same for all parts)
-        udh.append(total_parts)  # Total parts
-        udh.append(part_num)  # This part number
+        udh = bytes((
+            0x00,  # IEI: Concatenated short messages, 8-bit reference
+            0x03,  # IEDL: Length of header data
+            ref_num & 0xFF,  # Reference number (same for all parts)
+            total_parts,  # Total parts
+            part_num,  # This part number
+        ))
         
-        udh_len = len(udh) + 1  # +1 for UDHL
+        header_len = len(udh) + 1  # UDH octets, +1 for UDHL
         
         # Adjust UDL based on encoding
         if dcs == 0x00:  # GSM7
-            # For GSM7, we need to account for padding
-            padding_bits = 7 - ((udh_len + 1) * 8) % 7
-            if padding_bits == 7:
-                padding_bits = 0
-            # UDL = header length + text length + padding
-            total_udl = udh_len + 1 + len(text)
-            if padding_bits > 0:
-                total_udl += 1
-            pdu.append(total_udl)
+            # Fill bits so the text starts on a septet boundary after the header
+            padding_bits = (7 - (header_len * 8) % 7) % 7
+            # UDL = header septets (including fill bits) + text septets
+            pdu_append((header_len * 8 + padding_bits) // 7 + udl)
+            user_data = _pack_septets(septets, padding_bits)
         else:  # UCS2
-            pdu.append(udh_len + 1 + udl)
+            pdu_append(header_len + udl)
         
         # Add UDHL and UDH
-        pdu.append(udh_len)
+        pdu_append(len(udh))
         pdu.extend(udh)
         
-        # Add padding for GSM7
-        if dcs == 0x00 and padding_bits > 0:
-            # Re-encode with padding
-            user_data = encode_gsm7_with_padding(text, padding_bits)
-        
         pdu.extend(user_data)
     else:
         # Single SMS - no UDH
-        pdu.append(udl)
+        if dcs == 0x00:
+            user_data = _pack_septets(septets, 0)
+        pdu_append(udl)
         pdu.extend(user_data)
     
     # Convert to hex string
-    pdu_hex = ''.join(f'{b:02X}' for b in pdu)
+    pdu_hex = pdu.hex().upper()
     
     # TPDU length (everything except SMSC)
     tpdu_len = len(pdu) - 1
@@ -7,6 +7,7 @@ and sends them via a GSM modem. Supports multipart SMS with automatic
 concatenation for long messages.
 """
 
+import io
 import time
 import sys
 import logging
@@ -14,8 +15,9 @@ from logging.handlers import RotatingFileHandler
 
 # Import configuration
 from config import (
-    MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE,
-    SERIAL_PORT, SERIAL_BAUD, POLL_INTERVAL, MODEM_RESPONSE_TIMEOUT,
+    MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE, MYSQL_POOL_SIZE,
+    SERIAL_PORT, SERIAL_BAUD, POLL_INTERVAL, POLL_MIN_INTERVAL,
+    MODEM_RESPONSE_TIMEOUT, STRICT_DURABILITY, BATCH_SIZE,
     LOG_LEVEL, LOG_TO_CONSOLE, LOG_MAX_BYTES, LOG_BACKUP_COUNT
 )
 
@@ -49,7 +51,8 @@ def setup_logging():
         os.path.join(log_dir, 'service.log'),
         maxBytes=LOG_MAX_BYTES,
         backupCount=LOG_BACKUP_COUNT,
-        encoding='utf-8'
+        encoding='utf-8',
+        delay=True  # Open the file on the first record, not at startup
     )
     file_handler.setLevel(logging.DEBUG)
     
@@ -63,17 +66,19 @@ def setup_logging():
     
     # Optional console handler with Windows compatibility
     if LOG_TO_CONSOLE:
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))
-        console_handler.setFormatter(formatter)
+        stream = sys.stdout
         
-        # For Windows, set errors='replace' to avoid Unicode errors
+        # For Windows, write UTF-8 with errors='replace' to avoid Unicode errors
         if sys.platform == 'win32':
             try:
-                sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+                stream = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8',
+                                          errors='replace', line_buffering=True)
             except Exception:
                 pass
         
+        console_handler = logging.StreamHandler(stream)
+        console_handler.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))
+        console_handler.setFormatter(formatter)
         logger.addHandler(console_handler)
     
     return logger
@@ -95,13 +100,14 @@ def main():
 
     # Connect to MySQL
     try:
-        db, cursor = connect_database(MYSQL_CONFIG)
+        db_pool = connect_database(MYSQL_CONFIG, MYSQL_POOL_SIZE)
     except Exception as e:
         logger.critical(f"Cannot connect to MySQL: {e}")
         modem.disconnect()
         sys.exit(1)
 
-    logger.info(f"Poll interval: {POLL_INTERVAL} seconds")
+    logger.info(f"Poll interval: {POLL_MIN_INTERVAL}-{POLL_INTERVAL} seconds (adaptive)")
+    logger.info(f"Batch size: {BATCH_SIZE} messages per poll")
     logger.info(f"Modem response timeout: {MODEM_RESPONSE_TIMEOUT} seconds")
     logger.info("Multipart SMS: Enabled (automatic via gsmmodem library)")
     
@@ -116,29 +122,33 @@ def main():
     logger.info("=" * 60)
     
     loop_count = 0
+    poll_delay = POLL_MIN_INTERVAL
     try:
         while True:
             try:
                 loop_count += 1
                 logger.debug(f"Poll cycle #{loop_count}")
                 
-                # Check and refresh database connection periodically
-                if loop_count % 10 == 0:  # Every 10 cycles
-                    try:
-                        db.ping(reconnect=True)
-                        logger.debug("Database connection verified")
-                    except Exception as e:
-                        logger.warning(f"Database reconnection: {e}")
-                        db, cursor = connect_database(MYSQL_CONFIG)
-                        logger.info("Database reconnected")
-                
                 # Process pending SMS with new modem implementation
-                cursor = process_pending_sms_v2(cursor, db, modem)
+                # (the pool checks and reconnects the connection on checkout)
+                sent = process_pending_sms_v2(db_pool, modem, STRICT_DURABILITY, BATCH_SIZE)
+                
+                # Poll again quickly while messages go out, back off when idle
+                # (failed sends count as idle so retries are not rushed)
+                if sent:
+                    poll_delay = POLL_MIN_INTERVAL
+                else:
+                    poll_delay = min(poll_delay * 2, POLL_INTERVAL)
+                
+                # A full batch sent means more are likely queued: fetch the next one now
+                if sent >= BATCH_SIZE:
+                    continue
                 
             except Exception as e:
                 logger.error(f"Loop error: {e}", exc_info=True)
+                poll_delay = POLL_INTERVAL
             
-            time.sleep(POLL_INTERVAL)
+            time.sleep(poll_delay)
             
     except KeyboardInterrupt:
         logger.info("Daemon stopped by user (Ctrl+C)")
@@ -146,10 +156,6 @@ def main():
         logger.critical(f"Fatal error: {e}", exc_info=True)
     finally:
         logger.info("Closing connections...")
-        if 'cursor' in locals():
-            cursor.close()
-        if 'db' in locals():
-            db.close()
         modem.disconnect()
         logger.info("Shutdown complete")
 
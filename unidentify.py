@@ -5,15 +5,18 @@ Modem Auto-Detection Tool
 Automatically scans all available serial ports to find the GSM modem/dongle,
 displays its information, and optionally updates the config.py with the correct port.
 
-Usage: python unidentify.py
+Usage: python unidentify.py [--all]
 """
 
+import argparse
+import os
 import serial
-import serial.tools.list_ports
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
-import platform
 import re
+from pathlib import Path
 
 # For Windows console UTF-8 support
 if sys.platform == 'win32':
@@ -22,9 +25,44 @@ if sys.platform == 'win32':
     except:
         pass
 
+# USB vendor IDs of cellular modem makers; ports from these are probed first
+MODEM_VIDS = {
+    0x12D1,  # Huawei
+    0x19D2,  # ZTE
+    0x1BBB,  # Alcatel (T&A Mobile)
+    0x1E0E,  # SIMCom / Qualcomm
+    0x05C6,  # Qualcomm
+    0x2C7C,  # Quectel
+    0x1199,  # Sierra Wireless
+    0x1BC7,  # Telit
+    0x1546,  # u-blox
+    0x0E8D,  # MediaTek
+    0x1C9E,  # Longcheer
+}
+
+# Port descriptions that are never a GSM modem
+_NOT_A_MODEM_RE = re.compile(r'bluetooth|printer|debug|jtag', re.IGNORECASE)
+
+# A complete final result line that ends the response to a command; error
+# lines only count once their CRLF has arrived, so a split "+CME ERROR: 10"
+# is never cut short
+_FINAL_RESULT_RE = re.compile(rb'\r\nOK\r\n|(?:^|\n)(?:\+CM[ES] )?ERROR(?::[^\r\n]*)?\r\n')
+
+# A non-blank response line other than a bare OK, captured without its
+# surrounding whitespace
+_RESPONSE_LINE_RE = re.compile(r'^[^\S\n]*(?!OK[^\S\n]*$)(\S.*?)[^\S\n]*$', re.MULTILINE)
+
+# Manufacturers whose older modules only report the IMEI via AT+CGSN
+_CGSN_ONLY_RE = re.compile(r'SIMCOM|SIM\d', re.IGNORECASE)
+
+# Serial settings in config.py (anchored, so comments mentioning them are left alone)
+_CONFIG_PORT_RE = re.compile(r"^SERIAL_PORT\s*=\s*['\"].*?['\"]", re.MULTILINE)
+_CONFIG_BAUD_RE = re.compile(r"^SERIAL_BAUD\s*=\s*\d+", re.MULTILINE)
+
 
 def detect_os():
     """Detect the operating system."""
+    import platform
     system = platform.system()
     if system == 'Windows':
         return 'Windows'
@@ -36,55 +74,72 @@ def detect_os():
         return system
 
 
+def _workers_for_host():
+    """Number of ports to probe at once on this machine."""
+    # Raspberry Pis before the 4 hang every USB port off one shared hub, so
+    # more than a couple of concurrent probes just contend for it
+    try:
+        model = Path('/proc/device-tree/model').read_text(errors='ignore')
+    except OSError:
+        model = ''
+    if model.startswith('Raspberry Pi') and not re.match(r'Raspberry Pi [45]', model):
+        return 2
+    
+    return min(32, 4 * (os.cpu_count() or 1))
+
+
 def get_available_ports(os_type):
     """Get list of available serial ports based on OS."""
-    ports = serial.tools.list_ports.comports()
-    
-    if not ports:
-        return []
+    # Imported here: loading it probes for the platform's port backend
+    import serial.tools.list_ports
     
-    # Filter and format ports based on OS
-    available_ports = []
-    for port in ports:
-        port_info = {
+    # ListPortInfo always has these attributes (pyserial 3.x); they are None
+    # when the driver does not report them
+    return [
+        {
             'device': port.device,
-            'description': port.description,
-            'hwid': port.hwid,
-            'manufacturer': port.manufacturer if hasattr(port, 'manufacturer') else 'Unknown',
-            'product': port.product if hasattr(port, 'product') else 'Unknown',
-            'vid': port.vid if hasattr(port, 'vid') else None,
-            'pid': port.pid if hasattr(port, 'pid') else None,
+            'description': port.description or '',
+            'hwid': port.hwid or '',
+            'manufacturer': port.manufacturer or 'Unknown',
+            'product': port.product or 'Unknown',
+            'vid': port.vid,
+            'pid': port.pid,
+            'vidpid': (f"{port.vid:04X}:{port.pid:04X}"
+                       if port.vid is not None and port.pid is not None else None),
         }
-        available_ports.append(port_info)
-    
-    return available_ports
+        for port in serial.tools.list_ports.comports()
+    ]
 
 
 def send_at_command(ser, command, wait_time=1.0):
-    """Send AT command and return response."""
+    """Send AT command and return response ('' if the port stays silent)."""
     try:
-        # Clear any existing data
-        ser.flushInput()
-        ser.flushOutput()
+        # Drop anything left over from the previous command (e.g. a late URC)
+        # without a driver-level flush
+        if ser.in_waiting:
+            ser.read(ser.in_waiting)
         
         # Send command
         ser.write((command + '\r').encode())
-        time.sleep(wait_time)
         
-        # Read response
-        response = b''
-        while ser.in_waiting > 0:
-            response += ser.read(ser.in_waiting)
-            time.sleep(0.1)
+        # Read until the modem sends a final result code, giving up after
+        # wait_time seconds (ser.timeout keeps each read short)
+        response = bytearray()
+        deadline = time.monotonic() + wait_time
+        while time.monotonic() < deadline:
+            response.extend(ser.read(ser.in_waiting or 1))
+            if _FINAL_RESULT_RE.search(response):
+                break
         
-        # Decode and clean response
-        response_str = response.decode('utf-8', errors='ignore')
-        # Remove echo of command and clean up
-        lines = [line.strip() for line in response_str.split('\n') if line.strip()]
-        # Remove the command echo and OK
-        lines = [line for line in lines if line != command and line != 'OK' and line != '']
+        if not response:
+            # Nothing arrived before the deadline
+            return ''
         
-        return '\n'.join(lines) if lines else 'OK'
+        # Decode and clean response: keep the non-blank lines, minus the
+        # command echo and OK
+        response_str = response.decode('utf-8', errors='ignore')
+        return '\n'.join(line for line in _RESPONSE_LINE_RE.findall(response_str)
+                         if line != command) or 'OK'
     
     except Exception as e:
         return f'Error: {e}'
@@ -108,84 +163,153 @@ def parse_response(response, prefix=''):
     return None
 
 
-def test_modem_on_port(port_device, baud_rates=[9600, 115200, 19200, 57600]):
+def _probe_baud(port_device, baud):
+    """
+    Open the port at one baud rate and query the modem if it answers.
+    
+    Returns: dict with modem info if found, None otherwise
+    """
+    try:
+        # Try to open the port
+        # Short read timeout: send_at_command waits on its own deadline
+        ser = serial.Serial(port_device, baud, timeout=0.05, write_timeout=0.2)
+    except (serial.SerialException, OSError):
+        # Port is not accessible
+        return None
+    
+    try:
+        # Test basic AT command (a silent port returns ''). Most modems answer
+        # straight after the port opens; give slow ones time to settle and
+        # try once more before giving up
+        response = send_at_command(ser, 'AT', wait_time=0.2)
+        if 'OK' not in response:
+            time.sleep(0.3)
+            response = send_at_command(ser, 'AT', wait_time=0.5)
+        
+        if 'OK' not in response:
+            return None
+        
+        # This looks like a modem! Get more info
+        modem_info = {
+            'port': port_device,
+            'baud': baud,
+            'manufacturer': 'Unknown',
+            'model': 'Unknown',
+            'firmware': 'Unknown',
+            'imei': 'Unknown',
+            'sim_status': 'Unknown'
+        }
+        
+        if not _query_modem_info_chained(ser, modem_info):
+            _query_modem_info_separately(ser, modem_info)
+        
+        return modem_info
+    
+    except (serial.SerialException, OSError):
+        # Not a modem (or it went away mid-probe)
+        return None
+    finally:
+        ser.close()
+
+
+def _query_modem_info_chained(ser, modem_info):
+    """
+    Fill modem_info from a single chained AT command.
+    
+    Returns: False if the modem rejected the chain or the answer could not
+    be matched to the fields (then nothing is filled in)
+    """
+    resp = send_at_command(ser, 'AT+CGMI;+CGMM;+CGMR;+GSN;+CPIN?', wait_time=1.5)
+    if 'ERROR' in resp or 'Error' in resp:
+        return False
+    
+    # One line each for manufacturer, model, firmware and IMEI, in order,
+    # plus the +CPIN: line
+    values = [line.strip('"').strip() for line in resp.split('\n')
+              if not line.startswith('+CPIN:')]
+    if len(values) != 4:
+        return False
+    
+    modem_info['manufacturer'], modem_info['model'], modem_info['firmware'], modem_info['imei'] = values
+    
+    sim_status = parse_response(resp, '+CPIN: ')
+    if sim_status:
+        modem_info['sim_status'] = sim_status
+    
+    return True
+
+
+def _query_modem_info_separately(ser, modem_info):
+    """Fill modem_info with one AT command per field."""
+    # Get manufacturer
+    resp = send_at_command(ser, 'AT+CGMI')
+    manufacturer = parse_response(resp)
+    if manufacturer:
+        modem_info['manufacturer'] = manufacturer
+    
+    # Get model
+    resp = send_at_command(ser, 'AT+CGMM')
+    model = parse_response(resp)
+    if model:
+        modem_info['model'] = model
+    
+    # Get firmware
+    resp = send_at_command(ser, 'AT+CGMR')
+    firmware = parse_response(resp)
+    if firmware:
+        modem_info['firmware'] = firmware
+    
+    # Get IMEI (AT+GSN is the standard query; only retry with AT+CGSN for
+    # modules known to need it)
+    resp = send_at_command(ser, 'AT+GSN')
+    imei = parse_response(resp)
+    if not imei and _CGSN_ONLY_RE.search(modem_info['manufacturer']):
+        resp = send_at_command(ser, 'AT+CGSN')
+        imei = parse_response(resp)
+    if imei:
+        modem_info['imei'] = imei
+    
+    # Get SIM status
+    resp = send_at_command(ser, 'AT+CPIN?')
+    sim_status = parse_response(resp, '+CPIN: ')
+    if sim_status:
+        modem_info['sim_status'] = sim_status
+
+
+def test_modem_on_port(port_device, baud_rates=[9600, 115200, 19200, 57600], stop=None):
     """
     Test if a modem is connected to the specified port.
     Tries multiple baud rates.
     
+    The rates are tried one after another: a serial device can only be
+    open at one rate at a time, so they cannot be probed concurrently.
+    (Different ports are probed in parallel by scan_for_modems.)
+    If the optional threading.Event stop gets set, no further rates are tried.
+    
     Returns: dict with modem info if found, None otherwise
     """
     for baud in baud_rates:
+        if stop is not None and stop.is_set():
+            return None
+        
         try:
-            # Try to open the port
-            ser = serial.Serial(port_device, baud, timeout=1)
-            time.sleep(0.5)
-            
-            # Test basic AT command
-            response = send_at_command(ser, 'AT', wait_time=0.5)
-            
-            if 'OK' in response or response == 'OK' or response == '':
-                # This looks like a modem! Get more info
-                modem_info = {
-                    'port': port_device,
-                    'baud': baud,
-                    'manufacturer': 'Unknown',
-                    'model': 'Unknown',
-                    'firmware': 'Unknown',
-                    'imei': 'Unknown',
-                    'sim_status': 'Unknown'
-                }
-                
-                # Get manufacturer
-                resp = send_at_command(ser, 'AT+CGMI')
-                manufacturer = parse_response(resp)
-                if manufacturer:
-                    modem_info['manufacturer'] = manufacturer
-                
-                # Get model
-                resp = send_at_command(ser, 'AT+CGMM')
-                model = parse_response(resp)
-                if model:
-                    modem_info['model'] = model
-                
-                # Get firmware
-                resp = send_at_command(ser, 'AT+CGMR')
-                firmware = parse_response(resp)
-                if firmware:
-                    modem_info['firmware'] = firmware
-                
-                # Get IMEI
-                resp = send_at_command(ser, 'AT+GSN')
-                imei = parse_response(resp)
-                if not imei:
-                    resp = send_at_command(ser, 'AT+CGSN')
-                    imei = parse_response(resp)
-                if imei:
-                    modem_info['imei'] = imei
-                
-                # Get SIM status
-                resp = send_at_command(ser, 'AT+CPIN?')
-                sim_status = parse_response(resp, '+CPIN: ')
-                if sim_status:
-                    modem_info['sim_status'] = sim_status
-                
-                ser.close()
-                return modem_info
-            
-            ser.close()
-            
-        except (serial.SerialException, OSError) as e:
-            # Port is not accessible or not a modem
-            continue
-        except Exception as e:
-            # Other errors, skip this port
+            modem_info = _probe_baud(port_device, baud)
+        except Exception:
+            # Other errors, skip this baud rate
             continue
+        
+        if modem_info:
+            return modem_info
     
     return None
 
 
-def scan_for_modems(os_type):
-    """Scan all available ports for GSM modems."""
+def scan_for_modems(os_type, find_all=False):
+    """
+    Scan available ports for GSM modems.
+    
+    Stops at the first modem found unless find_all is True.
+    """
     print("=" * 70)
     print("MODEM AUTO-DETECTION TOOL")
     print("=" * 70)
@@ -220,8 +344,8 @@ def scan_for_modems(os_type):
             print(f"   Manufacturer : {port['manufacturer']}")
         if port['product'] != 'Unknown':
             print(f"   Product      : {port['product']}")
-        if port['vid'] and port['pid']:
-            print(f"   VID:PID      : {port['vid']:04X}:{port['pid']:04X}")
+        if port['vidpid']:
+            print(f"   VID:PID      : {port['vidpid']}")
         print()
     
     # Test each port for modem
@@ -230,22 +354,66 @@ def scan_for_modems(os_type):
     print("-" * 70)
     print()
     
+    # Ports from known modem vendors are probed first; the rest (including
+    # generic USB-serial adapters) only if none of those answered, or always
+    # when every port is to be tested
+    likely = []
+    others = []
+    for port in ports:
+        if _NOT_A_MODEM_RE.search(port['description']):
+            print(f"Skipping {port['device']} ({port['description']})")
+        elif port['vid'] in MODEM_VIDS:
+            likely.append(port)
+        else:
+            others.append(port)
+    
+    # One bounded pool serves both groups. Each task probes one port through
+    # all its baud rates (a port can only be open at one rate at a time)
+    stop = None if find_all else threading.Event()
+    with ThreadPoolExecutor(max_workers=_workers_for_host()) as executor:
+        found_modems = _probe_ports(executor, likely, stop)
+        if find_all or not found_modems:
+            found_modems += _probe_ports(executor, others, stop)
+    
+    print()
+    
+    return found_modems
+
+
+def _probe_ports(executor, ports, stop=None):
+    """
+    Test the given ports for a modem and return the info of those found.
+    
+    Without stop every port is tested and reported in port order. With a
+    threading.Event, results are reported as they finish and the scan ends
+    at the first modem: the event tells running probes to give up and
+    probes that have not started yet are cancelled.
+    """
     found_modems = []
     
-    for port in ports:
+    # Probing is almost all waiting on serial I/O, so the ports are tested in parallel
+    futures = {executor.submit(test_modem_on_port, port['device'], stop=stop): port
+               for port in ports}
+    
+    for future in (futures if stop is None else as_completed(futures)):
+        port = futures[future]
+        modem_info = future.result()
+        
         print(f"Testing {port['device']}...", end=' ')
         sys.stdout.flush()
         
-        modem_info = test_modem_on_port(port['device'])
-        
         if modem_info:
             print("[MODEM FOUND!]")
             found_modems.append(modem_info)
+            
+            if stop is not None:
+                stop.set()
+                for pending in futures:
+                    pending.cancel()
+                break
         else:
             print("[Not a modem]")
     
-    print()
-    
     return found_modems
 
 
@@ -269,26 +437,18 @@ def update_config_file(port, baud):
     """Update the config.py file with the correct port and baud rate."""
     try:
         # Read the current config file
-        with open('config.py', 'r', encoding='utf-8') as f:
-            config_content = f.read()
+        config_path = Path('config.py')
+        config_content = config_path.read_text(encoding='utf-8')
         
-        # Update SERIAL_PORT
-        config_content = re.sub(
-            r"SERIAL_PORT = ['\"].*?['\"]",
-            f"SERIAL_PORT = '{port}'",
-            config_content
-        )
+        # Update SERIAL_PORT (written as a Python literal, and through a
+        # function so backslashes in Windows device names are kept as-is)
+        config_content = _CONFIG_PORT_RE.sub(lambda m: f"SERIAL_PORT = {port!r}", config_content)
         
         # Update SERIAL_BAUD
-        config_content = re.sub(
-            r"SERIAL_BAUD = \d+",
-            f"SERIAL_BAUD = {baud}",
-            config_content
-        )
+        config_content = _CONFIG_BAUD_RE.sub(f"SERIAL_BAUD = {baud}", config_content)
         
         # Write the updated config back
-        with open('config.py', 'w', encoding='utf-8') as f:
-            f.write(config_content)
+        config_path.write_text(config_content, encoding='utf-8')
         
         return True
     except Exception as e:
@@ -298,11 +458,16 @@ def update_config_file(port, baud):
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description="Find the GSM modem and update config.py")
+    parser.add_argument('--all', action='store_true',
+                        help="test every port instead of stopping at the first modem found")
+    args = parser.parse_args()
+    
     # Detect OS
     os_type = detect_os()
     
     # Scan for modems
-    found_modems = scan_for_modems(os_type)
+    found_modems = scan_for_modems(os_type, find_all=args.all)
     
     if not found_modems:
         print("=" * 70)